@@ -6,6 +6,20 @@ load_dotenv(find_dotenv())
 SECRET_KEY = os.getenv('SECRET_KEY', 'secret-key')
 ALGORITHM = os.getenv('ALGORITHM', 'HS256')
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', '1440'))
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', '60'))
+ADMIN_CACHE_TTL = int(os.getenv('ADMIN_CACHE_TTL', '15'))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', '30'))
+# Keys the in-memory password verification cache; random per process unless set
+PASSWORD_CACHE_PEPPER = os.getenv('PASSWORD_CACHE_PEPPER', '').encode()[:64] or os.urandom(32)
+ARGON2_MEMORY_COST = int(os.getenv('ARGON2_MEMORY_COST', '65536'))
+ARGON2_TIME_COST = int(os.getenv('ARGON2_TIME_COST', '3'))
+ARGON2_PARALLELISM = int(os.getenv('ARGON2_PARALLELISM', '2'))
+# Scheme of the hash unknown emails are checked against; keep it on the scheme most stored users still have
+DUMMY_PASSWORD_SCHEME = os.getenv('DUMMY_PASSWORD_SCHEME', 'bcrypt')
+# Concurrent password hashes per worker; each argon2 hash holds ARGON2_MEMORY_COST KiB
+PASSWORD_HASH_CONCURRENCY = int(os.getenv('PASSWORD_HASH_CONCURRENCY', str(os.cpu_count() or 1)))
+# Worker threads for other blocking calls
+THREADPOOL_SIZE = int(os.getenv('THREADPOOL_SIZE', '64'))
 
 SMTP_SERVER = os.getenv('SMTP_SERVER')
 SMTP_PORT = os.getenv('SMTP_PORT')
@@ -18,6 +32,12 @@ HOME_EMAIL = os.getenv('HOME_EMAIL', False)
 WORK_DATABASE_URL = os.getenv('WORK_DATABASE_URL')
 LOCAL_DATABASE_URL = os.getenv('LOCAL_DATABASE_URL')
 
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '20'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '40'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DB_USE_PGBOUNCER = os.getenv('DB_USE_PGBOUNCER', 'false').lower() in ('1', 'true', 'yes')
+
 LOCAL_SMTP_SERVER = os.getenv('LOCAL_SMTP_SERVER')
 LOCAL_SMTP_PORT = os.getenv('LOCAL_SMTP_PORT')
 LOCAL_SENDER_EMAIL = os.getenv('LOCAL_SENDER_EMAIL')
@@ -33,6 +53,9 @@ LOCAL_SERVER_PORT = os.getenv('LOCAL_SERVER_PORT')
 WORK_SERVER_HOST = os.getenv('WORK_SERVER_HOST')
 WORK_SERVER_PORT = os.getenv('WORK_SERVER_PORT')
 
+# Comma-separated origins of the dashboard frontends; the '*' fallback is for local development and disables credentials
+CORS_ORIGINS = [origin.strip() for origin in os.getenv('CORS_ORIGINS', '*').split(',') if origin.strip()]
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MAIN_PHOTO_FOLDER = os.path.join(BASE_DIR, 'img')
 
@@ -46,4 +69,8 @@ MIME_TYPES = {
     "webp": "image/webp",
 }
 
+ALLOWED_EXTENSIONS = frozenset({"jpeg", "jpg", "png", "gif", "bmp", "webp"})
+
 PW_OK_PAGE = os.getenv('PW_OK_PAGE')
+
+RESET_TOKEN_PRUNE_INTERVAL = int(os.getenv('RESET_TOKEN_PRUNE_INTERVAL', '3600'))
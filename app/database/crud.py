@@ -1,9 +1,11 @@
 from fastapi import HTTPException
-from sqlalchemy import select, delete, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, insert, delete, func, bindparam, literal, null, true
+from sqlalchemy.orm import selectinload, raiseload
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any, List,  Optional
 from decimal import Decimal
+from datetime import datetime, timedelta
 import uuid
 import os
 import shutil
@@ -12,12 +14,30 @@ from app.database.models import (User,
                                  UserProfile,
                                  Restaurant,
                                  Category,
-                                 Dish
+                                 Dish,
+                                 ResetToken
                                  )
 
 from app.config import MAIN_PHOTO_FOLDER
 
 
+# Statements reused across requests, so they're built once and hit the compiled cache
+USER_BY_EMAIL = select(User).where(User.email == bindparam('email'))
+USER_BY_ID = select(User).where(User.id == bindparam('user_id'))
+DISH_BY_ID = select(Dish).where(Dish.id == bindparam('dish_id'))
+PROFILE_WITH_RESTAURANT_BY_EMAIL = (
+    select(UserProfile)
+    .options(selectinload(UserProfile.restaurant))
+    .join(User)
+    .where(User.email == bindparam('email'))
+)
+CONSUME_RESET_TOKEN = (
+    delete(ResetToken)
+    .where(ResetToken.token == bindparam('token'),
+           ResetToken.expiry_time >= func.timezone('utc', func.now()))
+    .returning(ResetToken.user_id)
+)
+
 def format_extra_prices(extra: Optional[Dict]) -> Optional[Dict]:
     if extra is None:
         return None
@@ -29,15 +49,27 @@ def format_extra_prices(extra: Optional[Dict]) -> Optional[Dict]:
     return formatted_extra
 
 
-async def crud_get_superusers(db: AsyncSession) -> List[User]:
+async def crud_get_superusers(db: AsyncSession) -> List[Dict[str, Any]]:
 
-    result = await db.execute(select(User).where(User.role == 'superuser'))
-    superusers = result.scalars().all()
+    result = await db.execute(
+        select(User.id, User.email, User.role, User.approved).where(User.role == 'superuser')
+    )
+    superusers = result.mappings().all()
     return list(superusers)
 
 
-async def crud_get_all_user_profiles(db: AsyncSession) -> Dict[uuid.UUID, Dict[str, Any]]:
-    result = await db.execute(select(UserProfile).join(User))
+async def crud_get_all_user_profiles(db: AsyncSession,
+                                     after: Optional[uuid.UUID] = None,
+                                     limit: Optional[int] = None) -> Dict[uuid.UUID, Dict[str, Any]]:
+    # Only profile columns are read below, so no relationship loading is needed;
+    # user_id is a non-null FK with ON DELETE CASCADE, so every profile has a user; no join needed
+    query = select(UserProfile).options(raiseload('*')).order_by(UserProfile.user_id)
+    # Keyset pagination on the unique user_id index, unlike OFFSET it doesn't rescan skipped rows
+    if after is not None:
+        query = query.where(UserProfile.user_id > after)
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
     profiles = result.scalars().all()
 
     profile_dict = {}
@@ -62,8 +94,9 @@ async def crud_get_all_user_profiles(db: AsyncSession) -> Dict[uuid.UUID, Dict[s
 
 async def crud_get_user_profile_by_email(db: AsyncSession, email: str) -> Optional[UserProfile]:
 
+    # Callers only read profile columns; any relationship access should fail loudly, not lazy-load
     result = await db.execute(
-        select(UserProfile).join(User).where(User.email == email)
+        select(UserProfile).join(User).where(User.email == email).options(raiseload('*'))
     )
     profile = result.scalars().first()
     return profile
@@ -167,8 +200,7 @@ async def crud_get_email_for_dish(db: AsyncSession, dish_id: int):
 
 
 async def crud_get_dish(db: AsyncSession, dish_id: int):
-    query = select(Dish).where(Dish.id == dish_id)
-    result = await db.execute(query)
+    result = await db.execute(DISH_BY_ID, {'dish_id': dish_id})
     return result.scalars().first()
 
 
@@ -177,53 +209,69 @@ async def crud_create_user_and_profile(db: AsyncSession,
                                        hashed_password: str,
                                        role: str,
                                        restaurant_currency: Optional[str] = None,
-                                       tables_amount: Optional[int] = None) -> User:
-    query = select(User).filter(User.email == email)
-    result = await db.execute(query)
-    db_user = result.scalars().first()
-    if db_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
+                                       tables_amount: Optional[int] = None) -> Dict[str, Any]:
+    if role == 'restaurant' and (restaurant_currency is None or tables_amount is None):
+        raise HTTPException(status_code=400, detail="Restaurant currency and tables amount are required for restaurant role")
+
+    users = User.__table__
+    restaurants = Restaurant.__table__
+    profiles = UserProfile.__table__
 
     approved = role == 'superuser'
 
-    db_user = User(email=email, hashed_password=hashed_password, role=role, approved=approved)
-    db.add(db_user)
-    await db.commit()
-    await db.refresh(db_user)
+    # The unique email index decides atomically whether the user already exists
+    user_insert = (
+        pg_insert(users)
+        .values(id=uuid.uuid4(), email=email, hashed_password=hashed_password, role=role, approved=approved)
+        .on_conflict_do_nothing(index_elements=[users.c.email])
+        .returning(users.c.id)
+    )
 
     if role == 'restaurant':
-        if restaurant_currency is None or tables_amount is None:
-            raise HTTPException(status_code=400, detail="Restaurant currency and tables amount are required for restaurant role")
-
-        db_profile = UserProfile(
-            user_id=db_user.id,
-            tables_amount=tables_amount,
-            restaurant_currency=restaurant_currency  # Explicitly set the restaurant_currency
+        # User, restaurant and profile go in one WITH ... INSERT round-trip; every step selects
+        # from the previous CTE, so nothing is inserted when the email is already taken
+        new_user = user_insert.cte('new_user')
+        new_restaurant = (
+            insert(restaurants)
+            .from_select(
+                ['name', 'rating', 'currency', 'tables_amount'],
+                select(literal("Default Restaurant Name"),
+                       literal(Decimal('0.0'), restaurants.c.rating.type),
+                       literal(restaurant_currency),
+                       literal(tables_amount)).select_from(new_user)
+            )
+            .returning(restaurants.c.id)
+            .cte('new_restaurant')
         )
-        db.add(db_profile)
-        await db.commit()
-        await db.refresh(db_profile)
-
-        db_restaurant = Restaurant(
-            name="Default Restaurant Name",
-            rating=Decimal('0.0'),
-            currency=restaurant_currency,  # Explicitly set the currency
-            tables_amount=tables_amount
+        statement = (
+            insert(profiles)
+            .from_select(
+                ['id', 'user_id', 'restaurant_id', 'tables_amount', 'restaurant_currency'],
+                select(literal(uuid.uuid4(), profiles.c.id.type),
+                       new_user.c.id,
+                       new_restaurant.c.id,
+                       literal(tables_amount),
+                       literal(restaurant_currency)).select_from(new_user.join(new_restaurant, true()))
+            )
+            .returning(profiles.c.user_id, profiles.c.restaurant_id)
         )
-        db.add(db_restaurant)
-        await db.commit()
-        await db.refresh(db_restaurant)
+    else:
+        statement = user_insert.returning(null().label('restaurant_id'))
 
-        db_profile.restaurant_id = db_restaurant.id
-        db.add(db_profile)
-        await db.commit()
-        await db.refresh(db_profile)
+    result = await db.execute(statement)
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=400, detail="Email already registered")
+
+    await db.commit()
 
-        restaurant_folder = os.path.join(MAIN_PHOTO_FOLDER, str(db_restaurant.id))
+    user_id, restaurant_id = row
+    if restaurant_id is not None:
+        restaurant_folder = os.path.join(MAIN_PHOTO_FOLDER, str(restaurant_id))
         if not os.path.exists(restaurant_folder):
             os.makedirs(restaurant_folder)
 
-    return db_user
+    return {"id": user_id, "email": email, "role": role}
 
 
 async def crud_update_user_profile_by_email(db: AsyncSession, email: str, profile_update: dict):
@@ -258,7 +306,6 @@ async def crud_update_user_profile_by_email(db: AsyncSession, email: str, profil
 
     db.add(profile)
     await db.commit()
-    await db.refresh(profile)
 
     return profile
 
@@ -266,27 +313,40 @@ async def crud_update_user_profile_by_email(db: AsyncSession, email: str, profil
 async def crud_delete_user_and_profile(db: AsyncSession,
                                   email: str):
 
-    query = select(User).filter(User.email == email).options(selectinload(User.profile).selectinload(UserProfile.restaurant))
-    result = await db.execute(query)
-    db_user = result.scalars().first()
+    # One statement: the user's restaurant is deleted alongside the user, and the profile
+    # and reset tokens go with them through ON DELETE CASCADE
+    deleted_user = (
+        delete(User)
+        .where(User.email == email)
+        .returning(User.id)
+        .cte('deleted_user')
+    )
+    deleted_restaurant = (
+        delete(Restaurant)
+        .where(Restaurant.id.in_(
+            select(UserProfile.restaurant_id).where(UserProfile.user_id.in_(select(deleted_user.c.id)))
+        ))
+        .returning(Restaurant.id)
+        .cte('deleted_restaurant')
+    )
+    result = await db.execute(
+        select(deleted_user.c.id, deleted_restaurant.c.id.label('restaurant_id'))
+        .select_from(deleted_user.outerjoin(deleted_restaurant, true()))
+        .execution_options(synchronize_session=False)
+    )
+    row = result.first()
 
-    if not db_user:
+    if row is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    if db_user.profile and db_user.profile.restaurant_id:
-        restaurant_query = delete(Restaurant).where(Restaurant.id == db_user.profile.restaurant_id)
-        await db.execute(restaurant_query)
+    await db.commit()
 
+    if row.restaurant_id is not None:
         # Delete the restaurant folder
-        restaurant_folder = os.path.join(MAIN_PHOTO_FOLDER, str(db_user.profile.restaurant_id))
+        restaurant_folder = os.path.join(MAIN_PHOTO_FOLDER, str(row.restaurant_id))
         if os.path.exists(restaurant_folder):
             shutil.rmtree(restaurant_folder)
 
-    user_query = delete(User).where(User.email == email)
-    await db.execute(user_query)
-
-    await db.commit()
-
 
 async def crud_create_dish(db: AsyncSession,
                       email: str,
@@ -324,7 +384,6 @@ async def crud_create_dish(db: AsyncSession,
     )
     db.add(dish)
     await db.commit()
-    await db.refresh(dish)
     return dish
 
 
@@ -338,7 +397,7 @@ async def crud_update_dish(db: AsyncSession,
                       photo=None,
                       extra=None):
 
-    result = await db.execute(select(Dish).where(Dish.id == dish_id))
+    result = await db.execute(DISH_BY_ID, {'dish_id': dish_id})
     dish = result.scalars().first()
     if not dish:
         raise ValueError("Dish not found")
@@ -366,10 +425,29 @@ async def crud_update_dish(db: AsyncSession,
 async def crud_delete_dish(db: AsyncSession,
                             dish_id: int):
 
-    result = await db.execute(select(Dish).where(Dish.id == dish_id))
+    result = await db.execute(DISH_BY_ID, {'dish_id': dish_id})
     dish = result.scalars().first()
     if not dish:
         raise ValueError("Dish not found")
 
     await db.delete(dish)
     await db.commit()
+
+
+async def crud_delete_expired_reset_tokens(db: AsyncSession,
+                                           grace: timedelta = timedelta(days=1)) -> int:
+    """
+    Deletes password reset tokens that expired more than `grace` ago.
+
+    Args:
+        db (AsyncSession): The SQLAlchemy asynchronous session.
+        grace (timedelta): How long expired tokens are kept before being pruned.
+
+    Returns:
+        int: The number of deleted tokens.
+    """
+    result = await db.execute(
+        delete(ResetToken).where(ResetToken.expiry_time < datetime.utcnow() - grace)
+    )
+    await db.commit()
+    return result.rowcount
@@ -60,9 +60,9 @@ class ResetToken(Base):
 
     __tablename__ = "reset_tokens"
 
-    token = Column(String, primary_key=True)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), index=True)
-    expiry_time = Column(DateTime, default=lambda: datetime.utcnow() + timedelta(hours=1))
+    token = Column(String(64), primary_key=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    expiry_time = Column(DateTime, index=True, default=lambda: datetime.utcnow() + timedelta(hours=1))
     user = relationship("User", backref="reset_tokens")
 
 
@@ -2,16 +2,44 @@ from sqlalchemy.ext.asyncio import (AsyncSession,
                                     async_sessionmaker,
                                     create_async_engine)
 from sqlalchemy.orm import declarative_base
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool
 
 import logging
+import asyncio
 import asyncpg
 
 from app.config import HOME_DB, WORK_DATABASE_URL, LOCAL_DATABASE_URL
+from app.config import (DB_POOL_SIZE,
+                        DB_MAX_OVERFLOW,
+                        DB_POOL_TIMEOUT,
+                        DB_POOL_RECYCLE,
+                        DB_USE_PGBOUNCER
+                        )
+
+
+def to_asyncpg_url(url):
+    """
+    Rewrites a PostgreSQL URL to use the asyncpg driver.
+
+    Args:
+        url (str | None): The configured database URL.
+
+    Returns:
+        str | None: The URL with a `postgresql+asyncpg` scheme, or the input unchanged if it isn't PostgreSQL.
+    """
+    if not url:
+        return url
+    scheme, separator, rest = url.partition('://')
+    if scheme in ('postgres', 'postgresql', 'postgresql+psycopg2', 'postgresql+psycopg'):
+        return f'postgresql+asyncpg{separator}{rest}'
+    return url
+
 
 if HOME_DB is True:
-    DATABASE_URL = LOCAL_DATABASE_URL
+    DATABASE_URL = to_asyncpg_url(LOCAL_DATABASE_URL)
 else:
-    DATABASE_URL = WORK_DATABASE_URL
+    DATABASE_URL = to_asyncpg_url(WORK_DATABASE_URL)
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -19,7 +47,23 @@ logger = logging.getLogger(__name__)
 
 # engine = create_async_engine(DATABASE_URL, echo=False)
 
-engine = create_async_engine(DATABASE_URL, pool_timeout=60, pool_size=250, max_overflow=50, echo=False)
+if DB_USE_PGBOUNCER:
+    # PgBouncer in transaction mode owns the pooling, so prepared statements can't be cached per connection
+    engine = create_async_engine(DATABASE_URL,
+                                 poolclass=NullPool,
+                                 connect_args={"statement_cache_size": 0,
+                                               "prepared_statement_cache_size": 0},
+                                 query_cache_size=1200,
+                                 echo=False)
+else:
+    engine = create_async_engine(DATABASE_URL,
+                                 pool_size=DB_POOL_SIZE,
+                                 max_overflow=DB_MAX_OVERFLOW,
+                                 pool_timeout=DB_POOL_TIMEOUT,
+                                 pool_recycle=DB_POOL_RECYCLE,
+                                 pool_pre_ping=True,
+                                 query_cache_size=1200,
+                                 echo=False)
 
 
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
@@ -29,7 +73,6 @@ Base = declarative_base()
 
 async def init_db():
     try:
-        engine = create_async_engine(DATABASE_URL, pool_timeout=60, pool_size=250, max_overflow=50, echo=False)
         async with engine.begin() as conn:
             logger.debug("Creating tables...")
             await conn.run_sync(Base.metadata.create_all)
@@ -38,6 +81,24 @@ async def init_db():
         logger.error(f"Error creating tables: {e}")
 
 
+async def warm_up_pool():
+    """
+    Opens the pool's connections up front so the first requests after startup don't pay for them.
+    """
+    if DB_USE_PGBOUNCER:
+        return
+
+    async def _ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    # Run concurrently, so each ping checks out a separate connection
+    results = await asyncio.gather(*(_ping() for _ in range(DB_POOL_SIZE)), return_exceptions=True)
+    failed = [result for result in results if isinstance(result, Exception)]
+    if failed:
+        logger.error(f"Error warming up the connection pool: {failed[0]}")
+
+
 async def get_session() -> AsyncSession:
     async with async_session() as session:
         yield session
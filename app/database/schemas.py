@@ -3,9 +3,9 @@ from pydantic import (BaseModel,
                       EmailStr,
                       condecimal,
                       field_validator,
-                      model_validator
+                      field_serializer
                       )
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from decimal import Decimal
 import uuid
 
@@ -85,6 +85,19 @@ class UserResponse(BaseModel):
         from_attributes = True
 
 
+class UsersPage(BaseModel):
+    """
+    Schema for a page of users returned by keyset pagination.
+
+    Attributes:
+        items (List[UserResponse]): The users on this page, ordered by ID.
+        next_after (Optional[uuid.UUID]): The user ID to pass as `after` to fetch the next page,
+            or None if this is the last page.
+    """
+    items: List[UserResponse]
+    next_after: Optional[uuid.UUID] = None
+
+
 class UserProfileResponse(BaseModel):
     """
     Schema for the response when querying detailed user profile information.
@@ -112,10 +125,10 @@ class UserProfileResponse(BaseModel):
     restaurant_currency: Optional[str]
     tables_amount: int
 
-    class Config:
-        json_encoders = {
-            Decimal: lambda v: f"{v:.1f}"  # Ensure one digit after the decimal point
-        }
+    @field_serializer('rating')
+    def serialize_rating(self, rating: Optional[Decimal]) -> Optional[str]:
+        # Ensure one digit after the decimal point
+        return None if rating is None else f"{rating:.1f}"
 
 
 class RestaurantsResponse(BaseModel):
@@ -126,8 +139,11 @@ class RestaurantsResponse(BaseModel):
         root (Dict[uuid.UUID, UserProfileResponse]): A dictionary where the keys are user IDs
             and the values are UserProfileResponse objects containing detailed information
             about the user's restaurant profile.
+        next_after (Optional[uuid.UUID]): The user ID to pass as `after` to fetch the next page,
+            or None if this is the last page.
     """
     root: Dict[uuid.UUID, UserProfileResponse]
+    next_after: Optional[uuid.UUID] = None
 
 
 class UserProfileUpdate(BaseModel):
@@ -139,7 +155,7 @@ class UserProfileUpdate(BaseModel):
         restaurant_reviews (Optional[str]): The reviews of the restaurant, if available.
         restaurant_photo (Optional[str]): A URL or reference to a photo of the restaurant, if available.
         telegram (Optional[str]): The Telegram handle of the user or restaurant, if provided.
-        rating (Optional[str]): The rating of the restaurant, if available.
+        rating (Optional[condecimal]): The rating of the restaurant from 0.0 to 9.9, if available.
         restaurant_currency (Optional[str]): The currency used by the restaurant, if specified.
         tables_amount (Optional[int]): The number of tables in the restaurant, if applicable.
     """
@@ -147,18 +163,11 @@ class UserProfileUpdate(BaseModel):
     restaurant_reviews: Optional[str] = None
     restaurant_photo: Optional[str] = None
     telegram: Optional[str] = None
-    rating: Optional[Decimal] = None
+    # Bounds are checked by pydantic-core before the handler runs
+    rating: Optional[condecimal(ge=Decimal("0.0"), le=Decimal("9.9"), max_digits=2, decimal_places=1)] = None
     restaurant_currency: Optional[str] = None
     tables_amount: Optional[int] = None
 
-    @model_validator(mode='before')
-    @classmethod
-    def validate_rating(cls, values):
-        rating = values.get('rating')
-        if rating is not None:
-            values['rating'] = round(rating, 1)
-        return values
-
 
 class PasswordResetRequest(BaseModel):
     """
@@ -5,17 +5,20 @@ from fastapi import (APIRouter,
                      status
                      )
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
 # Own imports
 from app.database.postgre_db import get_session
-from app.database.models import User, UserProfile
+from app.database.models import UserProfile
 from app.database.schemas import UserRegister, UserCreate, UserLogin
-from app.database.crud import crud_create_user_and_profile
-from app.utils.security import (get_password_hash,
-                                verify_password,
+from app.database.crud import crud_create_user_and_profile, USER_BY_EMAIL
+from app.utils.cache import clear_restaurants_cache
+from app.utils.security import (get_password_hash_async,
+                                verify_password_async,
                                 create_access_token,
-                                check_existing_token
+                                check_existing_token,
+                                invalidate_user,
+                                pwd_context,
+                                DUMMY_PASSWORD_HASH
                                 )
 
 
@@ -84,14 +87,13 @@ async def login(userlogin: UserLogin,
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="User is already authenticated. Please log out first.")
 
-    user = await db.execute(select(User).filter(User.email == userlogin.email))
-    user = user.scalars().first()
+    result = await db.execute(USER_BY_EMAIL, {'email': userlogin.email})
+    user = result.scalar_one_or_none()
 
-    if not user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
-                            detail="Invalid email or password")
+    hashed_password = user.hashed_password if user else DUMMY_PASSWORD_HASH
+    password_ok = await verify_password_async(userlogin.password, hashed_password)
 
-    if not verify_password(userlogin.password, user.hashed_password):
+    if not user or not password_ok:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                             detail="Invalid email or password")
 
@@ -99,6 +101,12 @@ async def login(userlogin: UserLogin,
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
                             detail="Incorrect role for user")
 
+    if pwd_context.needs_update(user.hashed_password):
+        # The plaintext is only known here, so legacy bcrypt hashes are upgraded on login
+        user.hashed_password = await get_password_hash_async(userlogin.password)
+        await db.commit()
+        invalidate_user(user.email)
+
     access_token = create_access_token(data={"sub": user.email, "role": user.role})
 
     return {"access_token": access_token, "token_type": "bearer"}
@@ -149,11 +157,12 @@ async def register_user(user_register: UserRegister,
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail="User is already authenticated. Please log out first.")
 
-    hashed_password = get_password_hash(user_register.password)
+    hashed_password = await get_password_hash_async(user_register.password)
 
     db_user = await crud_create_user_and_profile(db, user_register.email, hashed_password, "restaurant",
                                                  user_register.restaurant_currency, user_register.tables_amount)
+    clear_restaurants_cache()
 
-    return {"message": f"{db_user.role.capitalize()} successfully registered",
-            "email": str(db_user.email),
-            "user_id": str(db_user.id)}
+    return {"message": f"{db_user['role'].capitalize()} successfully registered",
+            "email": str(db_user["email"]),
+            "user_id": str(db_user["id"])}
@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, Body, Query
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from decimal import Decimal
 from typing import Optional, List
@@ -8,14 +7,14 @@ from typing import Optional, List
 from pydantic import BaseModel
 
 # Own imports
-from app.database.models import User, UserProfile, Dish, Category
+from app.database.models import User, Dish, Category
 from app.database.schemas import (DishResponse,
                                   DishCreate,
                                   DishUpdate,
                                   DishDelete
                                   )
 from app.database.postgre_db import get_session
-from app.utils.security import get_current_user
+from app.utils.security import get_current_user, authorize_email
 from app.database.crud import (crud_create_dish,
                                crud_update_dish,
                                crud_delete_dish,
@@ -26,8 +25,8 @@ from app.database.crud import (crud_create_dish,
                                format_extra_prices,
                                crud_get_user_profile_by_email,
                                crud_get_category_id_name_pairs,
-                               crud_get_all_categories
-
+                               crud_get_all_categories,
+                               PROFILE_WITH_RESTAURANT_BY_EMAIL
                                )
 
 router = APIRouter()
@@ -54,17 +53,17 @@ async def get_id_category_pairs(
 
 @router.post("/categories_in_restaurant/", description="Retrieve categories used in a restaurant linked with the user's email.")
 async def get_categories_in_restaurant(
-        email: str = Body(..., embed=True),
-        db: AsyncSession = Depends(get_session),
-        current_user: User = Depends(get_current_user)
+        email: str = Depends(authorize_email(Body(..., embed=True),
+                                             "You do not have permission to view these categories.")),
+        db: AsyncSession = Depends(get_session)
 ):
     """
     Retrieve categories used in a restaurant linked with the user's email.
 
     Args:
-        email (str): The email of the user whose linked restaurant's categories are to be retrieved.
+        email (str): The email of the user whose linked restaurant's categories are to be retrieved,
+            authorized against the current user by the dependency.
         db (AsyncSession): The SQLAlchemy asynchronous session, obtained from the dependency.
-        current_user (User): The current authenticated user, obtained from the dependency.
 
     Returns:
         CategoryResponse: The categories used in the restaurant linked with the user's email.
@@ -80,9 +79,6 @@ async def get_categories_in_restaurant(
     if profile.restaurant_id is None:
         raise HTTPException(status_code=404, detail="Restaurant not found for the user")
 
-    if current_user.role != 'superuser' and current_user.email != email:
-        raise HTTPException(status_code=403, detail="You do not have permission to view these categories.")
-
     category_id_name_pairs = await crud_get_category_id_name_pairs(db, profile.restaurant_id)
 
     return category_id_name_pairs
@@ -278,19 +274,19 @@ async def delete_dish(
                           f"If a category is provided, "
                           f"only dishes from that category are returned."))
 async def get_dishes_by_email(
-    email: str = Body(..., embed=True),
+    email: str = Depends(authorize_email(Body(..., embed=True),
+                                         "You do not have permission to view these dishes.")),
     category: Optional[int] = Body(None, embed=True),
-    db: AsyncSession = Depends(get_session),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_session)
 ):
     """
     Retrieve dishes by user email. If a category is provided, only dishes from that category are returned.
 
     Args:
-        email (str): The email of the user whose dishes are to be retrieved.
+        email (str): The email of the user whose dishes are to be retrieved,
+            authorized against the current user by the dependency.
         category (Optional[str]): The category of dishes to filter by.
         db (AsyncSession): The SQLAlchemy asynchronous session, obtained from the dependency.
-        current_user (User): The current authenticated user, obtained from the dependency.
 
     Returns:
         List[DishResponse]: The dishes associated with the user's email.
@@ -299,43 +295,38 @@ async def get_dishes_by_email(
         HTTPException: 403 Forbidden if the current user does not have permission to view these dishes.
         HTTPException: 404 Not Found if the user profile or restaurant is not found.
     """
-    if current_user.role == 'superuser' or current_user.email == email:
-        try:
-            profile = await db.execute(
-                select(UserProfile).options(selectinload(UserProfile.restaurant)).join(User).where(User.email == email)
+    try:
+        profile = await db.execute(PROFILE_WITH_RESTAURANT_BY_EMAIL, {'email': email})
+        profile = profile.scalars().first()
+        if not profile:
+            raise HTTPException(status_code=404, detail="User profile not found")
+
+        restaurant = profile.restaurant
+        if not restaurant:
+            raise HTTPException(status_code=404, detail="Restaurant not found for the user profile")
+
+        if category:
+            category_query = await db.execute(select(Category).where(Category.id == category))
+            category_obj = category_query.scalars().first()
+            if not category_obj:
+                raise HTTPException(status_code=404, detail="Category not found")
+
+            result = await db.execute(
+                select(Dish).where(Dish.restaurant_id == restaurant.id).where(Dish.category_id == category_obj.id)
             )
-            profile = profile.scalars().first()
-            if not profile:
-                raise HTTPException(status_code=404, detail="User profile not found")
-
-            restaurant = profile.restaurant
-            if not restaurant:
-                raise HTTPException(status_code=404, detail="Restaurant not found for the user profile")
-
-            if category:
-                category_query = await db.execute(select(Category).where(Category.id == category))
-                category_obj = category_query.scalars().first()
-                if not category_obj:
-                    raise HTTPException(status_code=404, detail="Category not found")
-
-                result = await db.execute(
-                    select(Dish).where(Dish.restaurant_id == restaurant.id).where(Dish.category_id == category_obj.id)
-                )
-            else:
-                result = await db.execute(select(Dish).where(Dish.restaurant_id == restaurant.id))
+        else:
+            result = await db.execute(select(Dish).where(Dish.restaurant_id == restaurant.id))
 
-            dishes = result.scalars().all()
-            return [DishResponse(
-                id=dish.id,
-                restaurant_id=dish.restaurant_id,
-                category_id=dish.category_id,
-                name=dish.name,
-                photo=dish.photo,
-                description=dish.description,
-                price=Decimal(str(dish.price)).quantize(Decimal('0.01')),
-                extra=format_extra_prices(dish.extra)
-            ) for dish in dishes]
-        except ValueError as e:
-            raise HTTPException(status_code=404, detail=str(e))
-    else:
-        raise HTTPException(status_code=403, detail="You do not have permission to view these dishes.")
+        dishes = result.scalars().all()
+        return [DishResponse(
+            id=dish.id,
+            restaurant_id=dish.restaurant_id,
+            category_id=dish.category_id,
+            name=dish.name,
+            photo=dish.photo,
+            description=dish.description,
+            price=Decimal(str(dish.price)).quantize(Decimal('0.01')),
+            extra=format_extra_prices(dish.extra)
+        ) for dish in dishes]
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
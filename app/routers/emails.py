@@ -8,16 +8,13 @@ import httpx
 from email.message import EmailMessage
 import secrets
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from datetime import datetime
-import random
-import string
 
 # Own imports
 from app.database.postgre_db import get_session
-from app.utils.security import get_password_hash, get_current_user, verify_password
+from app.utils.security import get_password_hash_async, get_current_user, invalidate_user
 from app.database.models import User, ResetToken
 from app.database.schemas import ChangePasswordRequest, PasswordResetRequest, EmailRequest
+from app.database.crud import USER_BY_EMAIL, USER_BY_ID, CONSUME_RESET_TOKEN
 from app.config import HOME_EMAIL
 from app.config import LOCAL_SERVER_HOST, LOCAL_SERVER_PORT, WORK_SERVER_HOST, WORK_SERVER_PORT
 from app.config import LOCAL_SMTP_SERVER, LOCAL_SMTP_PORT, LOCAL_SENDER_EMAIL, LOCAL_SENDER_PASSWORD
@@ -105,7 +102,7 @@ async def request_password_reset(password_reset_request: PasswordResetRequest, d
     email = password_reset_request.email
     token = secrets.token_urlsafe(32)
 
-    result = await db.execute(select(User).where(User.email == email))
+    result = await db.execute(USER_BY_EMAIL, {'email': email})
     user = result.scalars().first()
 
     if not user:
@@ -141,23 +138,18 @@ async def reset_password(token: str, db: AsyncSession = Depends(get_session)):
         HTTPException: 400 Bad Request if the token is invalid or has expired.
         HTTPException: 404 Not Found if the user is not found.
     """
-    result = await db.execute(select(ResetToken).where(ResetToken.token == token))
-    reset_token = result.scalars().first()
+    # Consume the token in one statement: expired or unknown tokens simply match no row
+    result = await db.execute(CONSUME_RESET_TOKEN, {'token': token})
+    user_id = result.scalar_one_or_none()
 
-    if not reset_token:
-        raise HTTPException(status_code=400, detail="Invalid token")
+    if user_id is None:
+        raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-    if reset_token.expiry_time < datetime.utcnow():
-        await db.delete(reset_token)
-        await db.commit()
-        raise HTTPException(status_code=400, detail="Token has expired")
+    new_password = secrets.token_urlsafe(9)
 
-    new_password = ''.join(random.choices(string.ascii_letters + string.digits, k=12))
+    hashed_password = await get_password_hash_async(new_password)
 
-    hashed_password = get_password_hash(new_password)
-
-    user_id = reset_token.user_id
-    result = await db.execute(select(User).where(User.id == user_id))
+    result = await db.execute(USER_BY_ID, {'user_id': user_id})
     user = result.scalars().first()
 
     if not user:
@@ -165,9 +157,8 @@ async def reset_password(token: str, db: AsyncSession = Depends(get_session)):
 
     user.hashed_password = hashed_password
 
-    await db.delete(reset_token)
-
     await db.commit()
+    invalidate_user(user.email)
 
     await send_email(
         subject="Your New Password",
@@ -206,18 +197,16 @@ async def change_password(request: ChangePasswordRequest,
     if current_user.email != request.email and current_user.role != 'superuser':
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to change this password")
 
-    query = select(User).filter(User.email == request.email)
-    result = await db.execute(query)
+    result = await db.execute(USER_BY_EMAIL, {'email': request.email})
     user = result.scalars().first()
 
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    hashed_new_password = get_password_hash(request.new_password)
+    hashed_new_password = await get_password_hash_async(request.new_password)
     user.hashed_password = hashed_new_password
-    db.add(user)
     await db.commit()
-    await db.refresh(user)
+    invalidate_user(request.email)
 
     return {"message": "Password changed successfully"}
 
@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Query, HTTPException, File, UploadFile
-from fastapi.responses import StreamingResponse
+from fastapi.responses import FileResponse
 import os
-import io
 
-from app.utils.functions import read_photo, save_upload_file
-from app.config import MIME_TYPES
+from app.utils.functions import save_upload_file, sniff_image_type
+from app.config import MIME_TYPES, ALLOWED_EXTENSIONS
 from app.config import MAIN_PHOTO_FOLDER
 
 router = APIRouter()
 
 default_avatar_path = os.path.join(MAIN_PHOTO_FOLDER, 'default_cafe_04.jpeg')
+default_extension = default_avatar_path.rpartition('.')[2].lower()
+
+allowed_extensions_text = ', '.join(sorted(ALLOWED_EXTENSIONS))
 
 
 @router.get("/")
@@ -25,68 +27,58 @@ async def get_image(
         photo (str): The filename of the photo to retrieve. If not provided, the default photo will be returned.
 
     Returns:
-        StreamingResponse: A streaming response containing the photo bytes.
+        FileResponse: A response streaming the photo file straight from disk.
 
     Raises:
         HTTPException: 404 error if the default photo is not found.
     """
+    full_path = None
     if restaurant_id and photo:
-        restaurant_id = str(restaurant_id)
-        full_path = os.path.join(MAIN_PHOTO_FOLDER, restaurant_id, photo)
+        file_extension = photo.rpartition('.')[2].lower() if '.' in photo else ''
+        candidate_path = os.path.join(MAIN_PHOTO_FOLDER, str(restaurant_id), photo)
+        if file_extension in ALLOWED_EXTENSIONS and os.path.isfile(candidate_path):
+            full_path = candidate_path
+
+    if full_path is not None:
+        # Uploaded photos rarely change, let the browser keep them
+        headers = {"Cache-Control": "public, max-age=86400"}
     else:
+        # The fallback must not be cached under the requested photo's URL
+        if not os.path.isfile(default_avatar_path):
+            raise HTTPException(status_code=404, detail="Default photo not found")
         full_path = default_avatar_path
-
-    if os.path.exists(full_path):
-        print('path exists', full_path)
-        photo_bytes = await read_photo(full_path)
-    else:
-        print('path NOT exists', full_path)
-        photo_bytes = None
-
-    if photo_bytes is None:
-        print('Loading default photo due to previous error or non-existence')
-        photo_bytes = await read_photo(default_avatar_path)
-
-    if photo_bytes is None:
-        raise HTTPException(status_code=404, detail="Default photo not found")
-
-    # Determine the media type based on the file extension
-    _, default_extension = os.path.splitext(default_avatar_path)
-    default_extension = default_extension[1:].lower()  # Remove the leading dot and convert to lowercase
-
-    if photo:
-        _, file_extension = os.path.splitext(photo)
-        file_extension = file_extension[1:].lower() if file_extension else default_extension
-    else:
         file_extension = default_extension
-
-    print('photo', photo, 'file_extension', file_extension)
+        headers = {"Cache-Control": "no-cache"}
 
     media_type = MIME_TYPES.get(file_extension, "application/octet-stream")
 
-    return StreamingResponse(io.BytesIO(photo_bytes), media_type=media_type)
+    return FileResponse(full_path, media_type=media_type, headers=headers)
 
 
 @router.post("/upload/")
 async def upload_file(file: UploadFile = File(...), restaurant_id: str = None, filename: str = None):
 
-    ALLOWED_EXTENSIONS = {"jpeg", "jpg", "png", "gif", "bmp", "webp"}
-
     if not restaurant_id:
         raise HTTPException(status_code=400, detail="Restaurant ID is required.")
     if not filename:
         raise HTTPException(status_code=400, detail="Filename is required.")
 
     # Check if the file extension is in the allowed list
-    file_extension = filename.split('.')[-1].lower()
+    file_extension = filename.rpartition('.')[2].lower()
     if file_extension not in ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail=f"File type '{file_extension}' is not allowed. "
-                                                    f"Allowed types are {', '.join(ALLOWED_EXTENSIONS)}.")
+                                                    f"Allowed types are {allowed_extensions_text}.")
 
     # Check if the file size is bigger than 5 MB
     if file.size > 5 * 1024 * 1024:
         raise HTTPException(status_code=404, detail="File size is bigger than the allowed 5 MB.")
 
+    # Check the actual content instead of trusting the extension
+    header = await file.read(12)
+    await file.seek(0)
+    if sniff_image_type(header) is None:
+        raise HTTPException(status_code=400, detail="Uploaded file is not a supported image.")
+
     destination = os.path.join(MAIN_PHOTO_FOLDER, restaurant_id, filename)
 
     os.makedirs(os.path.dirname(destination), exist_ok=True)
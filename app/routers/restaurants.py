@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from decimal import Decimal, InvalidOperation
+import uuid
 
 # Own imports
 from app.database.postgre_db import get_session
-from app.utils.security import get_current_user
-from app.database.models import User
+from app.utils.responses import DecimalORJSONResponse
+from app.utils.cache import restaurants_cache, clear_restaurants_cache
+from app.utils.security import TokenClaims, require_superuser_claims, authorize_email
 
 from app.database.schemas import (RestaurantsResponse,
                                   UserProfileResponse,
@@ -16,43 +17,53 @@ from app.database.crud import (crud_get_all_user_profiles,
                                crud_get_user_profile_by_email,
                                crud_update_user_profile_by_email)
 
-router = APIRouter()
+router = APIRouter(default_response_class=DecimalORJSONResponse)
 
 
-@router.get("/get_all_restaurants", response_model=RestaurantsResponse, description="Retrieve all restaurants for superusers.")
-async def all_restaurants(current_user: User = Depends(get_current_user),
+@router.get("/get_all_restaurants", response_model=RestaurantsResponse,
+            description="Retrieve all restaurants page by page for superusers.")
+async def all_restaurants(after: Optional[uuid.UUID] = None,
+                          limit: int = Query(100, ge=1, le=500),
+                          current_user: TokenClaims = Depends(require_superuser_claims),
                           db: AsyncSession = Depends(get_session)):
     """
-    Retrieve all restaurants for superusers. (Only for superusers).
+    Retrieve all restaurants page by page for superusers. (Only for superusers).
 
     Args:
-        current_user (User): The current authenticated user, obtained from the dependency.
+        after (Optional[uuid.UUID]): The `next_after` value of the previous page, or None for the first page.
+        limit (int): The maximum number of restaurants on the page.
+        current_user (TokenClaims): The claims of the current superuser's token, obtained from the dependency.
         db (AsyncSession): The SQLAlchemy asynchronous session, obtained from the dependency.
 
     Returns:
-        RestaurantsResponse: A response containing all restaurants.
+        RestaurantsResponse: A response containing the restaurants on this page and the cursor for the next one.
 
     Raises:
         HTTPException: 403 Forbidden if the current user is not a superuser.
     """
-    if current_user.role != 'superuser':
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only superusers can access this endpoint")
+    cache_key = (after, limit)
+    cached = restaurants_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
-    restaurants = await crud_get_all_user_profiles(db)
+    restaurants = await crud_get_all_user_profiles(db, after=after, limit=limit)
 
-    return {"root": restaurants}
+    next_after = next(reversed(restaurants)) if len(restaurants) == limit else None
+
+    page = {"root": restaurants, "next_after": next_after}
+    restaurants_cache[cache_key] = page
+    return page
 
 
 @router.get("/get_restaurant", response_model=Optional[UserProfileResponse], description="Retrieve a user profile by email.")
-async def get_profile_by_email(email: str,
-                               current_user: User = Depends(get_current_user),
+async def get_profile_by_email(email: str = Depends(authorize_email(Query(...))),
                                db: AsyncSession = Depends(get_session)):
     """
     Retrieve a user profile by email.
 
     Args:
-        email (str): The email of the user whose profile is to be retrieved.
-        current_user (User): The current authenticated user, obtained from the dependency.
+        email (str): The email of the user whose profile is to be retrieved,
+            authorized against the current user by the dependency.
         db (AsyncSession): The SQLAlchemy asynchronous session, obtained from the dependency.
 
     Returns:
@@ -61,40 +72,35 @@ async def get_profile_by_email(email: str,
     Raises:
         HTTPException: 403 Forbidden if the current user does not have permission to access this profile.
     """
-    if current_user.role == 'superuser' or current_user.email == email:
-        profile = await crud_get_user_profile_by_email(db, email)
-        if profile:
-            return UserProfileResponse(
-                id=profile.id,
-                user_id=profile.user_id,
-                restaurant_id=profile.restaurant_id,
-                restaurant_name=profile.restaurant_name,
-                restaurant_reviews=profile.restaurant_reviews,
-                restaurant_photo=profile.restaurant_photo,
-                telegram=profile.telegram,
-                rating=profile.rating,
-                restaurant_currency=profile.restaurant_currency,
-                tables_amount=profile.tables_amount
-            )
-        return None
-
-    else:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    profile = await crud_get_user_profile_by_email(db, email)
+    if profile:
+        return UserProfileResponse(
+            id=profile.id,
+            user_id=profile.user_id,
+            restaurant_id=profile.restaurant_id,
+            restaurant_name=profile.restaurant_name,
+            restaurant_reviews=profile.restaurant_reviews,
+            restaurant_photo=profile.restaurant_photo,
+            telegram=profile.telegram,
+            rating=profile.rating,
+            restaurant_currency=profile.restaurant_currency,
+            tables_amount=profile.tables_amount
+        )
+    return None
 
 
 @router.patch("/update_restaurant", response_model=Optional[UserProfileResponse],
               description="Update a user profile by email.")
-async def update_profile_by_email(email: str,
-                                  profile_update: UserProfileUpdate,
-                                  current_user: User = Depends(get_current_user),
+async def update_profile_by_email(profile_update: UserProfileUpdate,
+                                  email: str = Depends(authorize_email(Query(...))),
                                   db: AsyncSession = Depends(get_session)):
     """
     Update a user profile by email.
 
     Args:
-        email (str): The email of the user whose profile is to be updated.
         profile_update (UserProfileUpdate): The updated profile data.
-        current_user (User): The current authenticated user, obtained from the dependency.
+        email (str): The email of the user whose profile is to be updated,
+            authorized against the current user by the dependency.
         db (AsyncSession): The SQLAlchemy asynchronous session, obtained from the dependency.
 
     Returns:
@@ -103,23 +109,11 @@ async def update_profile_by_email(email: str,
     Raises:
         HTTPException: 403 Forbidden if the current user does not have permission to update this profile.
         HTTPException: 404 Not Found if the profile is not found.
-        HTTPException: 400 Bad Request if the rating value is out of range.
     """
-    if current_user.role == 'superuser' or current_user.email == email:
-        profile_data = profile_update.dict(exclude_unset=True)
-
-        # Validate the rating value
-        if 'rating' in profile_data:
-            try:
-                rating = Decimal(profile_data['rating'])
-                if rating < Decimal('0.0') or rating > Decimal('9.9'):
-                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Rating value out of range")
-            except InvalidOperation:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid rating value")
-
-        profile = await crud_update_user_profile_by_email(db, email, profile_data)
-    else:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access denied")
+    profile_data = profile_update.model_dump(exclude_unset=True)
+
+    profile = await crud_update_user_profile_by_email(db, email, profile_data)
+    clear_restaurants_cache()
 
     if profile is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
@@ -1,58 +1,73 @@
 
 
 
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List
+from sqlalchemy import select, update
+from typing import List, Optional
+import uuid
 
 # Own imports
 from app.database.postgre_db import get_session
-from app.utils.security import get_current_user, get_password_hash
+from app.utils.responses import DecimalORJSONResponse
+from app.utils.cache import superusers_cache, clear_superusers_cache, clear_restaurants_cache
+from app.utils.security import (TokenClaims,
+                                require_superuser,
+                                require_superuser_claims,
+                                get_password_hash_async,
+                                invalidate_user
+                                )
 from app.database.models import User, UserProfile
-from app.database.schemas import UserResponse, ApproveUserRequest, UserCreate
+from app.database.schemas import UserResponse, UsersPage, ApproveUserRequest, UserCreate
 from app.database.crud import (crud_get_superusers,
                                crud_create_user_and_profile,
                                crud_delete_user_and_profile
                                )
 
-router = APIRouter()
+router = APIRouter(default_response_class=DecimalORJSONResponse)
 
 
-@router.get("/get_all_users", response_model=List[UserResponse], description="Retrieve all users. (Only for superusers)")
-async def all_users(current_user: User = Depends(get_current_user),
+@router.get("/get_all_users", response_model=UsersPage,
+            description="Retrieve all users page by page. (Only for superusers)")
+async def all_users(after: Optional[uuid.UUID] = None,
+                    limit: int = Query(100, ge=1, le=500),
+                    current_user: TokenClaims = Depends(require_superuser_claims),
                     db: AsyncSession = Depends(get_session)):
     """
-    Retrieve all users (Only for superusers).
+    Retrieve all users page by page (Only for superusers).
 
     Args:
-        current_user (User): The current authenticated user, obtained from the dependency.
+        after (Optional[uuid.UUID]): The `next_after` value of the previous page, or None for the first page.
+        limit (int): The maximum number of users on the page.
+        current_user (TokenClaims): The claims of the current superuser's token, obtained from the dependency.
         db (AsyncSession): The SQLAlchemy asynchronous session, obtained from the dependency.
 
     Returns:
-        List[UserResponse]: A list of all users.
+        UsersPage: The users on this page and the cursor for the next one.
 
     Raises:
         HTTPException: 403 Forbidden if the current user is not a superuser.
     """
-    if current_user.role != 'superuser':
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only superusers can access this endpoint")
-
-    query = select(User)
+    # Plain column rows skip ORM instance construction; UserResponse validates them directly
+    query = select(User.id, User.email, User.role, User.approved).order_by(User.id).limit(limit)
+    if after is not None:
+        query = query.where(User.id > after)
     result = await db.execute(query)
-    users = result.scalars().all()
+    users = result.mappings().all()
+
+    next_after = users[-1]['id'] if len(users) == limit else None
 
-    return users
+    return {"items": users, "next_after": next_after}
 
 
 @router.get("/get_all_superusers", response_model=List[UserResponse], description="Retrieve all superusers for superusers. (Only for superusers)")
-async def all_superusers(current_user: User = Depends(get_current_user),
+async def all_superusers(current_user: TokenClaims = Depends(require_superuser_claims),
                          db: AsyncSession = Depends(get_session)):
     """
     Retrieve all superusers (Only for superusers).
 
     Args:
-        current_user (User): The current authenticated user, obtained from the dependency.
+        current_user (TokenClaims): The claims of the current superuser's token, obtained from the dependency.
         db (AsyncSession): The SQLAlchemy asynchronous session, obtained from the dependency.
 
     Returns:
@@ -61,24 +76,24 @@ async def all_superusers(current_user: User = Depends(get_current_user),
     Raises:
         HTTPException: 403 Forbidden if the current user is not a superuser.
     """
-    if current_user.role != 'superuser':
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only superusers can access this endpoint")
-
-    superusers = await crud_get_superusers(db)
+    superusers = superusers_cache.get('all')
+    if superusers is None:
+        superusers = await crud_get_superusers(db)
+        superusers_cache['all'] = superusers
 
     return superusers
 
 
 @router.post("/approve_user", description="Approve a user by email. (Only for superusers)")
 async def approve(request: ApproveUserRequest,
-                  current_user: User = Depends(get_current_user),
+                  current_user: User = Depends(require_superuser),
                   db: AsyncSession = Depends(get_session)):
     """
     Approve a user by email (Only for superusers).
 
     Args:
         request (ApproveUserRequest): The request containing the email of the user to be approved.
-        current_user (User): The current authenticated user, obtained from the dependency.
+        current_user (User): The current superuser, obtained from the dependency.
         db (AsyncSession): The SQLAlchemy asynchronous session, obtained from the dependency.
 
     Returns:
@@ -88,33 +103,34 @@ async def approve(request: ApproveUserRequest,
         HTTPException: 403 Forbidden if the current user is not a superuser.
         HTTPException: 404 Not Found if the user is not found.
     """
-    if current_user.role != 'superuser':
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only superusers can access this endpoint")
-
-    query = select(User).filter(User.email == request.email)
-    result = await db.execute(query)
-    user = result.scalars().first()
-
-    if not user:
+    result = await db.execute(
+        update(User)
+        .where(User.email == request.email)
+        .values(approved=True)
+        .returning(User.id, User.email)
+        .execution_options(synchronize_session=False)
+    )
+    user = result.first()
+
+    if user is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-    user.approved = True
-    db.add(user)
     await db.commit()
-    await db.refresh(user)
+    invalidate_user(user.email)
+    clear_superusers_cache()
 
     return {"message": f"User {user.email} approved successfully"}
 
 
 @router.post("/create_new_user", description="Create a new user with specified role and restaurant details. (Only for superusers)")
-async def create_user(user_create: UserCreate, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_session)):
+async def create_user(user_create: UserCreate, current_user: User = Depends(require_superuser), db: AsyncSession = Depends(get_session)):
     """
     Create a new user with specified role and restaurant details. (Only for superusers)
 
     Args:
         user_create (UserCreate): The request containing the details of the user to be created,
         including role, email, password, restaurant currency, and tables amount.
-        current_user (User): The current authenticated user, obtained from the dependency.
+        current_user (User): The current superuser, obtained from the dependency.
         db (AsyncSession): The SQLAlchemy asynchronous session, obtained from the dependency.
 
     Returns:
@@ -123,27 +139,26 @@ async def create_user(user_create: UserCreate, current_user: User = Depends(get_
     Raises:
         HTTPException: 403 Forbidden if the current user is not a superuser.
     """
-    if current_user.role != 'superuser':
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only superusers can access this endpoint")
-
-    hashed_password = get_password_hash(user_create.password)
+    hashed_password = await get_password_hash_async(user_create.password)
 
     db_user = await crud_create_user_and_profile(db, user_create.email, hashed_password, user_create.role,
                                                  user_create.restaurant_currency, user_create.tables_amount)
+    clear_superusers_cache()
+    clear_restaurants_cache()
 
-    return {"message": f"{db_user.role.capitalize()} successfully registered",
-            "email": str(db_user.email),
-            "user_id": str(db_user.id)}
+    return {"message": f"{db_user['role'].capitalize()} successfully registered",
+            "email": str(db_user["email"]),
+            "user_id": str(db_user["id"])}
 
 
 @router.delete("/delete_user_by_email/", description="Delete a user by email. (Only for superusers)")
-async def delete_user(email: str = Body(..., embed=True), current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_session)):
+async def delete_user(email: str = Body(..., embed=True), current_user: User = Depends(require_superuser), db: AsyncSession = Depends(get_session)):
     """
     Delete a user by email (Only for superusers).
 
     Args:
         email (str): The email of the user to be deleted, embedded in the body.
-        current_user (User): The current authenticated user, obtained from the dependency.
+        current_user (User): The current superuser, obtained from the dependency.
         db (AsyncSession): The SQLAlchemy asynchronous session, obtained from the dependency.
 
     Returns:
@@ -152,10 +167,10 @@ async def delete_user(email: str = Body(..., embed=True), current_user: User = D
     Raises:
         HTTPException: 403 Forbidden if the current user is not a superuser.
     """
-    if current_user.role != 'superuser':
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only superusers can access this endpoint")
-
     await crud_delete_user_and_profile(db, email)
+    invalidate_user(email)
+    clear_superusers_cache()
+    clear_restaurants_cache()
 
     return {"message": "User and associated profile and restaurant successfully deleted"}
 
@@ -0,0 +1,22 @@
+from cachetools import TTLCache
+
+from app.config import ADMIN_CACHE_TTL
+
+# Payloads of the admin list endpoints, keyed by their query parameters.
+# Dashboards poll these, so a few seconds of staleness saves most of the SQL.
+superusers_cache = TTLCache(maxsize=16, ttl=ADMIN_CACHE_TTL)
+restaurants_cache = TTLCache(maxsize=1024, ttl=ADMIN_CACHE_TTL)
+
+
+def clear_superusers_cache():
+    """
+    Drop cached superuser lists after a user is created, approved or deleted.
+    """
+    superusers_cache.clear()
+
+
+def clear_restaurants_cache():
+    """
+    Drop cached restaurant pages after a restaurant profile is created, updated or deleted.
+    """
+    restaurants_cache.clear()
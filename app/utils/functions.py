@@ -1,95 +1,65 @@
-import os
-import tempfile
-from PIL import Image
+import asyncio
+import logging
 import aiofiles
 from fastapi import UploadFile, HTTPException
 
+from app.database.postgre_db import async_session
+from app.database.crud import crud_delete_expired_reset_tokens
 
-async def read_photo(photo_path):
-    """
-    Asynchronously reads the contents of a photo file.
+logger = logging.getLogger(__name__)
 
-    Args:
-        photo_path (str): The path to the photo file.
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
 
-    Returns:
-        bytes | None: The binary data of the photo file if found and has a valid extension, otherwise None.
 
-    Raises:
-        FileNotFoundError: If the file at `photo_path` does not exist.
-        Exception: For any other errors encountered while reading the file.
+def sniff_image_type(header: bytes):
     """
-    # Define the allowed file extensions and their corresponding MIME types
-    allowed_extensions = {
-        "jpeg",
-        "jpg",
-        "png",
-        "gif",
-        "bmp",
-        "webp"
-    }
-
-    # Get the file extension
-    _, file_extension = os.path.splitext(photo_path)
-    file_extension = file_extension[1:].lower()  # Remove the leading dot and convert to lowercase
+    Detects the image type from the leading bytes of a file.
 
-    print(f"File extension: {file_extension}")
-
-    # Check if the file extension is allowed
-    if file_extension not in allowed_extensions:
-        print(f"Invalid file extension: {file_extension}")
-        return None
+    Args:
+        header (bytes): At least the first 12 bytes of the file.
 
-    try:
-        async with aiofiles.open(photo_path, 'rb') as photo_file:
-            photo_data = await photo_file.read()
-            return photo_data
-    except FileNotFoundError:
-        print(f"File not found: {photo_path}")
-        return None
-    except Exception as e:
-        print(f"Error reading photo {photo_path}: {e}")
-        return None
+    Returns:
+        str | None: The detected image type ("jpeg", "png", "gif", "bmp" or "webp"), otherwise None.
+    """
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if header.startswith(b"BM"):
+        return "bmp"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
 
 
 async def save_upload_file(upload_file: UploadFile, destination: str):
     if upload_file is None:
-        print("No file provided.")
+        logger.warning("No file provided.")
         return
 
     try:
         async with aiofiles.open(destination, 'wb') as out_file:
-            while content := await upload_file.read(1024):  # Read file in chunks
+            while content := await upload_file.read(UPLOAD_CHUNK_SIZE):  # Read file in chunks
                 await out_file.write(content)
-    except Exception as e:
-        print(f"Error saving file: {e}")
+    except Exception:
+        logger.exception("Error saving file %s", destination)
         raise HTTPException(status_code=500, detail="There was an error uploading the file.")
 
 
-#
-# async def save_upload_file(upload_file: UploadFile, destination: str):
-#     if upload_file is None:
-#         print("No file provided.")
-#         return
-#
-#     with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
-#         temp_filename = temp_file.name
-#         async with aiofiles.open(temp_filename, 'wb') as out_file:
-#             while content := await upload_file.read(1024):  # Read file in chunks
-#                 await out_file.write(content)
-#
-#     try:
-#         img = Image.open(temp_filename)
-#         width, height = img.size
-#
-#         if max(width, height) > 1024:
-#             aspect_ratio = min(1024 / width, 1024 / height)
-#             new_size = (int(width * aspect_ratio), int(height * aspect_ratio))
-#             img = img.resize(new_size, Image.Resampling.LANCZOS)
-#
-#         img.save(destination)
-#     except Exception as e:
-#         print(f"Error processing image: {e}")
-#         return
-#     finally:
-#         os.remove(temp_filename)
+async def prune_reset_tokens_periodically(interval: int):
+    """
+    Periodically deletes long-expired password reset tokens.
+
+    Args:
+        interval (int): The number of seconds to wait between runs.
+    """
+    while True:
+        try:
+            async with async_session() as db:
+                deleted = await crud_delete_expired_reset_tokens(db)
+            logger.debug(f"Pruned {deleted} expired reset tokens.")
+        except Exception as e:
+            logger.error(f"Error pruning reset tokens: {e}")
+        await asyncio.sleep(interval)
@@ -0,0 +1,33 @@
+from decimal import Decimal
+
+import orjson
+from fastapi.responses import ORJSONResponse
+
+
+def orjson_default(obj):
+    """
+    Fallback serializer for types orjson does not handle natively.
+
+    Args:
+        obj (Any): The object orjson could not serialize.
+
+    Returns:
+        str: The string representation of a Decimal value.
+
+    Raises:
+        TypeError: If the object type is not supported.
+    """
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class DecimalORJSONResponse(ORJSONResponse):
+    """
+    ORJSONResponse that also serializes Decimal values (prices, ratings) as strings.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content,
+                            default=orjson_default,
+                            option=orjson.OPT_NON_STR_KEYS)
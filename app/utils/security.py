@@ -11,45 +11,261 @@ from fastapi.security import (OAuth2PasswordBearer,
                               )
 
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
+
+import anyio
+import anyio.to_thread
 
 from passlib.context import CryptContext
+import bcrypt
+from cachetools import TTLCache, TLRUCache
 import jwt
-from datetime import datetime, timedelta
+import jwt.api_jws
+import jwt.api_jwt
+import json
+import orjson
+import base64
+import re
+import secrets
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 
 # Own import
 from app.database.postgre_db import get_session
 from app.database.models import User
+from app.database.crud import USER_BY_EMAIL
 from app.config import (SECRET_KEY,
                         ALGORITHM,
-                        ACCESS_TOKEN_EXPIRE_MINUTES
+                        ACCESS_TOKEN_EXPIRE_MINUTES,
+                        USER_CACHE_TTL,
+                        TOKEN_CACHE_TTL,
+                        PASSWORD_CACHE_PEPPER,
+                        ARGON2_MEMORY_COST,
+                        ARGON2_TIME_COST,
+                        ARGON2_PARALLELISM,
+                        PASSWORD_HASH_CONCURRENCY,
+                        DUMMY_PASSWORD_SCHEME
                         )
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+
+class _OrjsonForPyJWT:
+    """
+    Stand-in for the `json` module inside PyJWT, so token headers and payloads go through orjson.
+    Calls with a custom encoder class fall back to the standard library.
+    """
+    JSONEncoder = json.JSONEncoder
+    JSONDecodeError = json.JSONDecodeError
+
+    @staticmethod
+    def dumps(obj, *, cls=None, sort_keys=False, **kwargs):
+        if cls is not None:
+            return json.dumps(obj, cls=cls, sort_keys=sort_keys, **kwargs)
+        # orjson output is already compact, matching PyJWT's (",", ":") separators
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS if sort_keys else 0).decode()
+
+    loads = staticmethod(orjson.loads)
+
+
+jwt.api_jws.json = _OrjsonForPyJWT
+jwt.api_jwt.json = _OrjsonForPyJWT
+
+# New hashes use Argon2id; bcrypt stays verifiable and is rehashed on the next successful login
+pwd_context = CryptContext(schemes=["argon2", "bcrypt"],
+                           default="argon2",
+                           deprecated="auto",
+                           argon2__memory_cost=ARGON2_MEMORY_COST,
+                           argon2__time_cost=ARGON2_TIME_COST,
+                           argon2__parallelism=ARGON2_PARALLELISM)
+_BCRYPT_PREFIXES = ("$2a$", "$2b$")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
 
 security = HTTPBearer()
 
+_DEFAULT_DELTA = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+# Only the configured algorithm is accepted; built once instead of per decode
+_ALGORITHMS = [ALGORITHM]
+# PyJWT rejects tokens missing either claim, so payloads always carry both
+_DECODE_OPTIONS = {"require": ["exp", "sub"]}
+
+# Detached users keyed by email, so every token of the same user shares one entry.
+# Routes that change a user call invalidate_user, but that only clears this worker's cache:
+# other worker processes keep the old row until the TTL expires.
+_user_cache = TTLCache(maxsize=5000, ttl=USER_CACHE_TTL)
+
+
+def _payload_ttu(_key, payload, now):
+    # Never keep a payload past the token's own expiry
+    return min(now + TOKEN_CACHE_TTL, payload["exp"])
+
+
+# Verified token payloads keyed by the token's SHA-256, so repeat requests skip the HMAC check and JSON parsing
+_payload_cache = TLRUCache(maxsize=10000, ttu=_payload_ttu, timer=time.time)
 
-def get_password_hash(password: str) -> str:
+
+# Successful password checks keyed by a peppered BLAKE2b of (password, hash); failures are never stored.
+# Verification runs in worker threads, hence the lock.
+_verify_cache = TTLCache(maxsize=2048, ttl=300)
+_verify_cache_lock = threading.Lock()
+
+
+def invalidate_user(email: str):
+    """
+    Drops a user from the authentication cache after their row changes.
+
+    Args:
+        email (str): The email of the changed user.
+    """
+    _user_cache.pop(email, None)
+
+
+def _hash_sync(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def verify_password(plain_password, hashed_password):
+def _check_password(plain_password: str, hashed_password: str) -> bool:
+    if hashed_password.startswith(_BCRYPT_PREFIXES):
+        # Legacy bcrypt hashes go straight to the bcrypt package, skipping passlib's scheme dispatch
+        try:
+            return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+        except ValueError:
+            return False
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def _verify_sync(plain_password, hashed_password):
+    key = hashlib.blake2b(plain_password.encode() + b"|" + hashed_password.encode(),
+                          key=PASSWORD_CACHE_PEPPER, digest_size=16).digest()
+    with _verify_cache_lock:
+        if key in _verify_cache:
+            return True
+
+    if not _check_password(plain_password, hashed_password):
+        return False
+
+    with _verify_cache_lock:
+        _verify_cache[key] = True
+    return True
+
+
+# Caps concurrent hashes separately from the general thread pool, so a login flood can't
+# hold THREADPOOL_SIZE x ARGON2_MEMORY_COST at once. Created on first use, inside the event loop.
+_password_hash_limiter = None
+
+
+def _get_password_hash_limiter() -> anyio.CapacityLimiter:
+    global _password_hash_limiter
+    if _password_hash_limiter is None:
+        _password_hash_limiter = anyio.CapacityLimiter(PASSWORD_HASH_CONCURRENCY)
+    return _password_hash_limiter
+
+
+async def get_password_hash_async(password: str) -> str:
+    # Hashing is CPU-bound for 100+ ms, so it runs in a worker thread instead of blocking the event loop
+    return await anyio.to_thread.run_sync(_hash_sync, password, limiter=_get_password_hash_limiter())
+
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    return await anyio.to_thread.run_sync(_verify_sync, plain_password, hashed_password,
+                                          limiter=_get_password_hash_limiter())
+
+
+def benchmark_password_hash() -> float:
+    """
+    Times one password hash with the configured cost and warns if it falls outside the 100-400 ms budget.
+
+    Returns:
+        float: The hashing time in milliseconds.
+    """
+    started = time.perf_counter()
+    pwd_context.hash(secrets.token_urlsafe(16))
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if not 100 <= elapsed_ms <= 400:
+        logger.warning("Password hashing took %.0f ms, outside the 100-400 ms budget; "
+                       "tune ARGON2_MEMORY_COST / ARGON2_TIME_COST", elapsed_ms)
+    return elapsed_ms
+
+
+# Verified against when the user doesn't exist, so unknown emails take as long as wrong passwords.
+# It must use the scheme of the users not yet rehashed on login (bcrypt by default), otherwise
+# "no such user" and "legacy bcrypt user" would differ in timing.
+DUMMY_PASSWORD_HASH = pwd_context.handler(DUMMY_PASSWORD_SCHEME).hash(secrets.token_urlsafe(16))
+
+
 def create_access_token(data: dict, expires_delta: timedelta = None):
-    to_encode = data.copy()
-    if expires_delta is None:
-        expires_delta = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    expire = datetime.utcnow() + expires_delta
-    to_encode.update({"exp": expire})
+    expire = datetime.now(timezone.utc) + (expires_delta or _DEFAULT_DELTA)
+    to_encode = {**data, "exp": expire}
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+@dataclass(frozen=True)
+class TokenClaims:
+    """
+    Identity carried by a verified access token.
+
+    Attributes:
+        email (str): The email of the user the token was issued to.
+        role (str): The role of the user at the time the token was issued.
+    """
+    email: str
+    role: str
+
+
+_JWT_SHAPE = re.compile(r"[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+\.[A-Za-z0-9_-]+")
+
+
+def _check_token_shape(token: str):
+    # Bounces garbage and unexpected algorithms (e.g. "none") before any HMAC or payload parsing
+    if _JWT_SHAPE.fullmatch(token) is None:
+        raise jwt.InvalidTokenError("Malformed token")
+    header_b64 = token.partition(".")[0]
+    try:
+        header = orjson.loads(base64.urlsafe_b64decode(header_b64 + "=" * (-len(header_b64) % 4)))
+    except ValueError:
+        raise jwt.InvalidTokenError("Malformed token header")
+    if not isinstance(header, dict) or header.get("alg") != ALGORITHM:
+        raise jwt.InvalidTokenError("Unexpected token algorithm")
+
+
+def _decode_cached(token: str) -> dict:
+    key = hashlib.sha256(token.encode()).digest()
+    payload = _payload_cache.get(key)
+    if payload is None:
+        # Invalid tokens raise here and are never cached
+        _check_token_shape(token)
+        payload = jwt.decode(token, SECRET_KEY, algorithms=_ALGORITHMS, options=_DECODE_OPTIONS)
+        _payload_cache[key] = payload
+    return payload
+
+
+def decode_access_token(token: str) -> dict:
+    """
+    Verifies an access token and returns its payload.
+
+    Args:
+        token (str): The raw JWT.
+
+    Returns:
+        dict: The decoded payload, guaranteed to contain the subject email.
+
+    Raises:
+        HTTPException: 403 Forbidden if the token is invalid, expired or has no subject.
+    """
+    try:
+        payload = _decode_cached(token)
+    except jwt.PyJWTError:
+        raise HTTPException(status_code=403, detail="Invalid authentication credentials")
+    return payload
+
+
 # async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_session)):
 #     credentials_exception = HTTPException(
 #         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -72,48 +288,157 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 #     return user
 
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Security(security),
-                           db: AsyncSession = Depends(get_session)):
+async def _resolve_user_from_token(token: str, db: AsyncSession) -> Optional[User]:
+    """
+    Resolves the user a token was issued to, going through the payload and user caches.
 
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+    Args:
+        token (str): The raw JWT.
+        db (AsyncSession): The SQLAlchemy asynchronous session used on a cache miss.
 
+    Returns:
+        Optional[User]: The detached user, or None if the token is invalid or the user no longer exists.
+    """
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(status_code=403, detail="Invalid authentication credentials")
+        payload = _decode_cached(token)
     except jwt.PyJWTError:
-        raise HTTPException(status_code=403, detail="Invalid authentication credentials")
+        return None
+    email: str = payload["sub"]
+
+    user = _user_cache.get(email)
+    if user is not None:
+        return user
+
+    result = await db.execute(USER_BY_EMAIL, {'email': email})
+    user = result.scalar_one_or_none()
+    # Constant-time comparison; bytes, since compare_digest rejects non-ASCII str
+    if user is None or not hmac.compare_digest(user.email.encode(), email.encode()):
+        return None
+
+    # Detach it so the cached instance isn't shared with later sessions' identity maps
+    db.expunge(user)
+    _user_cache[email] = user
+
+    return user
 
-    user = await db.execute(select(User).filter(User.email == email))
-    user = user.scalars().first()
+
+async def get_current_user(request: Request,
+                           credentials: HTTPAuthorizationCredentials = Security(security),
+                           db: AsyncSession = Depends(get_session)):
+
+    # Resolved once per request, whichever auth helper gets there first
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
+
+    user = await _resolve_user_from_token(credentials.credentials, db)
     if user is None:
-        raise credentials_exception
+        raise HTTPException(status_code=403, detail="Invalid authentication credentials")
 
+    request.state.user = user
     return user
 
 
+async def get_token_claims(credentials: HTTPAuthorizationCredentials = Security(security)) -> TokenClaims:
+    """
+    Authenticates a request from the signed token alone, without loading the user from the database.
+
+    Suitable for read-only endpoints that only need the caller's email and role; a role change
+    or deletion is only seen once the token expires.
+
+    Args:
+        credentials (HTTPAuthorizationCredentials): The bearer credentials, obtained from the dependency.
+
+    Returns:
+        TokenClaims: The email and role carried by the token.
+
+    Raises:
+        HTTPException: 403 Forbidden if the token is invalid, expired or has no subject.
+    """
+    payload = decode_access_token(credentials.credentials)
+    return TokenClaims(email=payload["sub"], role=payload.get("role"))
+
+
+def _ensure_superuser(role: str):
+    if role != 'superuser':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only superusers can access this endpoint")
+
+
+async def require_superuser(current_user: User = Depends(get_current_user)) -> User:
+    """
+    Resolves the current user and rejects anyone who is not a superuser before the route body runs.
+
+    Args:
+        current_user (User): The current authenticated user, obtained from the dependency.
+
+    Returns:
+        User: The current superuser.
+
+    Raises:
+        HTTPException: 403 Forbidden if the current user is not a superuser.
+    """
+    _ensure_superuser(current_user.role)
+    return current_user
+
+
+async def require_superuser_claims(claims: TokenClaims = Depends(get_token_claims)) -> TokenClaims:
+    """
+    Same as require_superuser, but checks the role carried by the token without a database lookup.
+
+    Args:
+        claims (TokenClaims): The claims of the current access token, obtained from the dependency.
+
+    Returns:
+        TokenClaims: The claims of the current superuser.
+
+    Raises:
+        HTTPException: 403 Forbidden if the token was not issued to a superuser.
+    """
+    _ensure_superuser(claims.role)
+    return claims
+
+
+def authorize_email(email_param, detail: str = "Access denied"):
+    """
+    Builds a dependency that reads the target email and checks that the current user
+    is either a superuser or the owner of that email, before the route body runs.
+
+    Args:
+        email_param (Body | Query): The FastAPI parameter the email is read from,
+            e.g. Body(..., embed=True) or Query(...).
+        detail (str): The error detail returned when access is denied.
+
+    Returns:
+        Callable: A dependency returning the authorized email.
+    """
+    async def _authorize_email(email: str = email_param,
+                               current_user: User = Depends(get_current_user)) -> str:
+        if current_user.role != 'superuser' and current_user.email != email:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=detail)
+        return email
+
+    return _authorize_email
+
+
 async def check_existing_token(request: Request, db: AsyncSession = Depends(get_session)):
-    authorization: str = request.headers.get("Authorization")
-    if authorization:
-        try:
-            scheme, credentials = authorization.split()
-            if scheme.lower() == "bearer":
-                token = credentials
-                payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-                email: str = payload.get("sub")
-                if email is None:
-                    raise HTTPException(status_code=403, detail="Invalid authentication credentials")
-                user = await db.execute(select(User).filter(User.email == email))
-                user = user.scalars().first()
-                if user is None:
-                    raise HTTPException(status_code=403, detail="Invalid authentication credentials")
-                return user
-        except jwt.PyJWTError:
-            raise HTTPException(status_code=403, detail="Invalid authentication credentials")
-    return None
+    # ASGI header names are already lowercase bytes, so scanning the scope skips building a Headers object
+    authorization = None
+    for name, value in request.scope["headers"]:
+        if name == b"authorization":
+            authorization = value.decode("latin-1")
+            break
+
+    # The scheme is case-insensitive, as in HTTPBearer
+    if not authorization or authorization[:7].lower() != "bearer ":
+        return None
+
+    user = getattr(request.state, "user", None)
+    if user is not None:
+        return user
+
+    user = await _resolve_user_from_token(authorization[7:].strip(), db)
+    if user is None:
+        raise HTTPException(status_code=403, detail="Invalid authentication credentials")
+
+    request.state.user = user
+    return user
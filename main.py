@@ -1,12 +1,20 @@
+import asyncio
+import contextlib
 from contextlib import asynccontextmanager
 
+import anyio.to_thread
+
 from fastapi import FastAPI
 from fastapi.responses import RedirectResponse
 from fastapi.security import HTTPBearer
 from starlette.middleware.cors import CORSMiddleware
 
 # Own imports
-from app.database.postgre_db import init_db
+from app.database.postgre_db import init_db, warm_up_pool
+from app.utils.responses import DecimalORJSONResponse
+from app.utils.functions import prune_reset_tokens_periodically
+from app.utils.security import benchmark_password_hash
+from app.config import RESET_TOKEN_PRUNE_INTERVAL, THREADPOOL_SIZE, CORS_ORIGINS
 # Routers
 from app.routers.auth import router as auth_router
 from app.routers.dishes import router as dishes_router
@@ -20,13 +28,22 @@ from app.routers.users import router as users_router
 async def lifespan(app: FastAPI):
     """
     Context manager for the FastAPI application lifespan.
-    Initializes the database connection on startup.
+    Initializes the database, opens the connection pool and checks the password hashing cost on startup,
+    and runs the expired reset token cleanup in the background.
 
     Args:
         app (FastAPI): The FastAPI application instance.
     """
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
     await init_db()
+    await warm_up_pool()
+    await anyio.to_thread.run_sync(benchmark_password_hash)
+    prune_task = asyncio.create_task(prune_reset_tokens_periodically(RESET_TOKEN_PRUNE_INTERVAL))
     yield
+    prune_task.cancel()
+    # Let an in-flight prune finish unwinding and release its connection before shutdown continues
+    with contextlib.suppress(asyncio.CancelledError):
+        await prune_task
 
 
 # Application description
@@ -48,6 +65,7 @@ Superusers can manage all cafes and users.
 
 app = FastAPI(
     lifespan=lifespan,
+    default_response_class=DecimalORJSONResponse,
     title="FastAPI Admin Dashboard",
     description=app_description,
     version="1.0.0",
@@ -66,18 +84,25 @@ security = HTTPBearer()
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=['*'],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"]
+    allow_origins=CORS_ORIGINS,
+    # Starlette echoes any Origin when '*' is allowed, so the wildcard fallback never sends credentials
+    allow_credentials="*" not in CORS_ORIGINS,
+    allow_methods=["GET", "POST", "PUT", "DELETE", "PATCH"],
+    allow_headers=["Authorization", "Content-Type"]
 )
 
-app.include_router(auth_router, prefix="/api/auth", tags=["authentication"])
-app.include_router(users_router, prefix="/api/users", tags=["superuser operations"])
-app.include_router(restaurants_router, prefix="/api/restaurants", tags=["restaurant operations"])
-app.include_router(emails_router, prefix="/api/emails", tags=["password and email operations"])
-app.include_router(dishes_router, prefix="/api/dishes", tags=["dishes operations"])
-app.include_router(image_router, prefix="/api/images", tags=["image operations"])
+# Every router the app serves, with its URL prefix and OpenAPI tags
+ROUTERS = [
+    (auth_router, "/api/auth", ["authentication"]),
+    (users_router, "/api/users", ["superuser operations"]),
+    (restaurants_router, "/api/restaurants", ["restaurant operations"]),
+    (emails_router, "/api/emails", ["password and email operations"]),
+    (dishes_router, "/api/dishes", ["dishes operations"]),
+    (image_router, "/api/images", ["image operations"]),
+]
+
+for router, prefix, tags in ROUTERS:
+    app.include_router(router, prefix=prefix, tags=tags)
 
 
 @app.get("/")